@@ -1,9 +1,10 @@
+import hashlib
+import hmac
+from collections import Counter
 import streamlit as st
-import fitz
 import pandas as pd
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-import matplotlib.pyplot as plt
+import ahocorasick
 
 USERS = {
     "admin": {"password": "admin123", "role": "admin"},
@@ -17,6 +18,29 @@ BENCHMARKS = [
     "AI techniques for predictive maintenance in mines.",
 ]
 
+KEYWORDS = {
+    "Relevance": ("coal mining", "safety", "environmental sustainability", "energy efficiency", "automation", "clean coal"),
+    "Technical Feasibility": ("objective", "methodology", "timeline", "resources", "expertise", "partnership"),
+    "Impact": ("efficiency", "safety", "environment", "emissions", "clean energy"),
+    "Institutional Capability": ("track record", "expertise", "facility", "experience"),
+    "Compliance": ("forms", "annexures", "financial details", "approval", "ethical", "regulatory"),
+}
+_N_KEYWORD_SLOTS = sum(len(keys) for keys in KEYWORDS.values())
+
+@st.cache_resource(show_spinner=False)
+def _keyword_automaton():
+    # A keyword may count towards several criteria, so each one carries a
+    # tuple of (criterion, bit) tags.
+    tags = {}
+    for criterion, keys in KEYWORDS.items():
+        for i, kw in enumerate(keys):
+            tags.setdefault(kw, []).append((criterion, 1 << i))
+    automaton = ahocorasick.Automaton()
+    for kw, kw_tags in tags.items():
+        automaton.add_word(kw, tuple(kw_tags))
+    automaton.make_automaton()
+    return automaton
+
 if "logged_in" not in st.session_state:
     st.session_state.logged_in = False
 if "username" not in st.session_state:
@@ -25,43 +49,80 @@ if "role" not in st.session_state:
     st.session_state.role = ""
 if "proposals" not in st.session_state:
     st.session_state.proposals = []
+if "proposals_by_user" not in st.session_state:
+    st.session_state.proposals_by_user = {}
+    for i, p in enumerate(st.session_state.proposals):
+        st.session_state.proposals_by_user.setdefault(p["user"], []).append(i)
 
+@st.cache_data(show_spinner=False, max_entries=128)
 def extract_pdf_text(pdf_bytes):
+    import fitz
+    # PyMuPDF's default "text" flags, without whitespace preservation and with
+    # dehyphenation so keywords split across line breaks still match.
+    flags = fitz.TEXTFLAGS_TEXT & ~fitz.TEXT_PRESERVE_WHITESPACE | fitz.TEXT_DEHYPHENATE
     try:
-        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-        text = ""
-        for page in doc:
-            text += page.get_text()
-        return text
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+            return "".join([page.get_text("text", flags=flags) for page in doc.pages()])
     except:
         return ""
 
+def read_budget_csv(budget_file):
+    kwargs = {"usecols": ["Amount"], "dtype": {"Amount": np.float64}}
+    try:
+        return pd.read_csv(budget_file, engine="pyarrow", **kwargs)
+    except ImportError:
+        budget_file.seek(0)
+        return pd.read_csv(budget_file, **kwargs)
+
 def min_score(val, default=10):
     return max(val, default)
 
-def score_relevance(text):
-    keywords = ["coal mining", "safety", "environmental sustainability", "energy efficiency","automation", "clean coal"]
-    val = round(100 * sum(kw in text.lower() for kw in keywords) / len(keywords), 2)
-    return min_score(val)
-
-def score_novelty(text):
-    docs = BENCHMARKS + [text]
-    tfidf = TfidfVectorizer().fit_transform(docs)
-    sims = (tfidf[-1] @ tfidf[:-1].T).toarray()[0]
-    val = round((1 - np.max(sims)) * 100, 2)
-    return min_score(val)
-
-def score_technical_feasibility(text):
-    keys = ["objective", "methodology", "timeline", "resources", "expertise", "partnership"]
-    val = round(100 * sum(k in text.lower() for k in keys) / len(keys), 2)
-    return min_score(val)
+@st.cache_data(show_spinner=False, max_entries=256)
+def score_all(text_digest, _lowered):
+    masks = dict.fromkeys(KEYWORDS, 0)
+    found = 0
+    for _, kw_tags in _keyword_automaton().iter(_lowered):
+        for criterion, bit in kw_tags:
+            if not masks[criterion] & bit:
+                masks[criterion] |= bit
+                found += 1
+        # Every criterion is saturated; the rest of the text cannot change a score.
+        if found == _N_KEYWORD_SLOTS:
+            break
+    return {c: min_score(100 * bin(mask).count("1") / len(KEYWORDS[c]))
+            for c, mask in masks.items()}
+
+@st.cache_resource(show_spinner=False)
+def _novelty_index():
+    # HashingVectorizer is stateless, so the benchmark rows are computed once
+    # per process and only new proposal text is transformed per submission.
+    # Rows are L2-normalized, so their dot product is the cosine similarity.
+    # Callers pass text that is already lowercased. The few benchmark rows are
+    # kept dense and stored pre-transposed (n_features x n_benchmarks,
+    # C-contiguous) so each query is one sparse-by-dense product.
+    from sklearn.feature_extraction.text import HashingVectorizer
+    vec = HashingVectorizer(n_features=2**14, alternate_sign=False, norm="l2",
+                            lowercase=False, dtype=np.float32)
+    bench = vec.transform([b.lower() for b in BENCHMARKS]).toarray()
+    return vec, np.ascontiguousarray(bench.T)
+
+def score_novelty_batch(lowered_texts):
+    # One transform and one product for all texts, floored like min_score.
+    vec, bench_t = _novelty_index()
+    sims = vec.transform(lowered_texts) @ bench_t
+    return np.maximum((1 - sims.max(axis=1)) * 100, 10)
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def score_novelty(text_digest, _lowered):
+    return float(score_novelty_batch([_lowered])[0])
 
 def score_financial_viability(budget_df):
     issues = []
-    total = budget_df["Amount"].sum()
+    amounts = budget_df["Amount"].to_numpy()
+    total = float(np.nansum(amounts))
     max_total = 2000000
     milestone_limit = 0.4
-    first_milestone = budget_df.iloc[0]["Amount"] if not budget_df.empty else 0
+    first_milestone = float(amounts[0]) if amounts.size else 0.0
 
     if total > max_total:
         issues.append("Budget exceeds max INR 20 lakhs")
@@ -70,31 +131,29 @@ def score_financial_viability(budget_df):
     score = 100 if not issues else 50
     return min_score(score), issues
 
-def score_impact_potential(text):
-    keys = ["efficiency", "safety", "environment", "emissions", "clean energy"]
-    val = round(100 * sum(k in text.lower() for k in keys) / len(keys), 2)
-    return min_score(val)
-
-def score_institutional_capability(text):
-    keys = ["track record", "expertise", "facility", "experience"]
-    val = round(100 * sum(k in text.lower() for k in keys) / len(keys), 2)
-    return min_score(val)
-
-def score_compliance_and_completeness(text):
-    keys = ["forms", "annexures", "financial details", "approval", "ethical", "regulatory"]
-    val = round(100 * sum(k in text.lower() for k in keys) / len(keys), 2)
-    return min_score(val)
-
 def compute_weighted_score(text, budget_df):
-    r1 = score_relevance(text)
-    r2 = score_novelty(text)
-    r3 = score_technical_feasibility(text)
+    # Hash the text once; every scoring cache keys on this digest and takes the
+    # text as an underscore argument, which Streamlit leaves out of the key.
+    text_digest = hashlib.blake2b(text.encode()).digest()
+    amounts = tuple(budget_df["Amount"].to_numpy().tolist())
+    return _cached_weighted_score(text_digest, amounts, text, budget_df)
+
+@st.cache_data(show_spinner=False, max_entries=128)
+def _cached_weighted_score(text_digest, amounts, _text, _budget_df):
+    return _weighted_score(text_digest, _text, _budget_df)
+
+def _weighted_score(text_digest, text, budget_df):
+    low = text.lower()
+    kw = score_all(text_digest, low)
+    r1 = kw["Relevance"]
+    r2 = score_novelty(text_digest, low)
+    r3 = kw["Technical Feasibility"]
     r4, fin_issues = score_financial_viability(budget_df)
-    r5 = score_impact_potential(text)
-    r6 = score_institutional_capability(text)
-    r7 = score_compliance_and_completeness(text)
+    r5 = kw["Impact"]
+    r6 = kw["Institutional Capability"]
+    r7 = kw["Compliance"]
 
-    score = round(r1*0.2 + r2*0.2 + r3*0.2 + r4*0.15 + r5*0.15 + r6*0.05 + r7*0.05,2)
+    score = r1*0.2 + r2*0.2 + r3*0.2 + r4*0.15 + r5*0.15 + r6*0.05 + r7*0.05
     if score >= 70:
         status = "Accepted"
         reasons = []
@@ -111,7 +170,7 @@ def compute_weighted_score(text, budget_df):
 
 def authenticate(username, password):
     user = USERS.get(username)
-    if user and user["password"] == password:
+    if user and hmac.compare_digest(user["password"].encode(), password.encode()):
         return user["role"]
     return None
 
@@ -152,18 +211,18 @@ def company_dashboard():
             if not pdf_file or not budget_file:
                 st.error("Please upload both PDF and Budget CSV")
                 return
-            text = extract_pdf_text(pdf_file.read())
+            text = extract_pdf_text(pdf_file.getvalue())
             if not text.strip():
                 st.error("Could not extract text from PDF")
                 return
             try:
-                budget_df = pd.read_csv(budget_file)
+                budget_df = read_budget_csv(budget_file)
+            except (ValueError, KeyError):
+                st.error("Budget CSV must include a numeric 'Amount' column")
+                return
             except:
                 st.error("Error reading budget CSV")
                 return
-            if "Amount" not in budget_df.columns:
-                st.error("Budget CSV must include 'Amount' column")
-                return
             scores = compute_weighted_score(text, budget_df)
             proposal = {
                 "id": len(st.session_state.proposals)+1,
@@ -173,16 +232,19 @@ def company_dashboard():
                 "status": scores["Status"],
                 "eval_comment": ""
             }
+            st.session_state.proposals_by_user.setdefault(st.session_state.username, []).append(
+                len(st.session_state.proposals))
             st.session_state.proposals.append(proposal)
             st.success(f"Proposal submitted with status: {scores['Status']}")
 
     st.subheader("Your proposals")
-    user_props = [p for p in st.session_state.proposals if p["user"] == st.session_state.username]
+    user_idx = st.session_state.proposals_by_user.get(st.session_state.username, [])
+    user_props = [st.session_state.proposals[i] for i in user_idx]
     for p in user_props:
         st.markdown(f"**Proposal #{p['id']}** - Status: {p['status']}")
         for k, v in p["scores"].items():
             if k not in ["Reasons", "Status"]:
-                st.write(f"{k}: {v}")
+                st.write(f"{k}: {v:.2f}")
         if p["scores"]["Reasons"]:
             st.warning("Reasons:")
             for r in p["scores"]["Reasons"]:
@@ -190,48 +252,36 @@ def company_dashboard():
         if p["eval_comment"]:
             st.info(f"Evaluator Comment: {p['eval_comment']}")
 
-def plot_status_distribution(proposals):
-    from collections import Counter
-    status_counts = Counter(p["status"] for p in proposals)
+CRITERIA = ["Relevance", "Novelty", "Technical Feasibility",
+            "Financial Viability", "Impact", "Institutional Capability", "Compliance"]
+
+def plot_status_distribution(status_counts):
     statuses = ["Accepted", "Conditional Acceptance (Revision Needed)", "Rejected"]
     counts = [status_counts.get(s, 0) for s in statuses]
+    st.bar_chart(pd.Series(counts, index=statuses, name="Number of Proposals"))
 
-    fig, ax = plt.subplots()
-    ax.bar(statuses, counts, color=['green', 'orange', 'red'])
-    ax.set_title("Proposal Status Distribution")
-    ax.set_ylabel("Number of Proposals")
-    return fig
+def proposals_frame(proposals):
+    rows = [{"id": p["id"], "user": p["user"], **p["scores"],
+             "Status": p["status"], "Evaluator Comment": p["eval_comment"]} for p in proposals]
+    return pd.DataFrame(rows, columns=["id", "user", "Status", *CRITERIA, "Overall Score",
+                                       "Reasons", "Evaluator Comment"])
 
-def plot_average_scores(proposals):
-    criteria = ["Relevance", "Novelty", "Technical Feasibility",
-                "Financial Viability", "Impact", "Institutional Capability", "Compliance"]
-    if not proposals:
+def plot_average_scores(df):
+    if df.empty:
         st.info("No proposals to plot scores.")
-        return None
-
-    avg_scores = {c: np.mean([p["scores"][c] for p in proposals]) for c in criteria}
-    values = list(avg_scores.values())
-    angles = np.linspace(0, 2 * np.pi, len(criteria), endpoint=False).tolist()
-    values += values[:1]
-    angles += angles[:1]
-
-    fig, ax = plt.subplots(figsize=(6,6), subplot_kw=dict(polar=True))
-    ax.plot(angles, values, 'o-', linewidth=2)
-    ax.fill(angles, values, alpha=0.25)
-    ax.set_thetagrids(np.degrees(angles[:-1]), criteria)
-    ax.set_ylim(0, 100)
-    ax.set_title("Average Proposal Scores Radar Chart")
-    return fig
+        return
+    st.bar_chart(df[CRITERIA].mean().rename("Average Score"))
 
 def admin_dashboard():
     st.header(f"Welcome, {st.session_state.username} (Admin)")
     proposals = st.session_state.proposals
-    #proposals = 2
-    
+    df = proposals_frame(proposals)
+
     total_props = len(proposals)
-    accepted = len([p for p in proposals if p["status"] == "Accepted"])
-    conditional = len([p for p in proposals if "Conditional" in p["status"]])
-    rejected = len([p for p in proposals if p["status"] == "Rejected"])
+    status_counts = Counter(p["status"] for p in proposals)
+    accepted = status_counts.get("Accepted", 0)
+    conditional = sum(n for s, n in status_counts.items() if "Conditional" in s)
+    rejected = status_counts.get("Rejected", 0)
 
     st.subheader("Summary Statistics")
     st.write(f"Total proposals: {total_props}")
@@ -240,31 +290,19 @@ def admin_dashboard():
     st.write(f"Rejected: {rejected}")
 
     st.subheader("Graphs")
-    fig1 = plot_status_distribution(proposals)
-    if fig1:
-        st.pyplot(fig1)
-
-    fig2 = plot_average_scores(proposals)
-    if fig2:
-        st.pyplot(fig2)
+    plot_status_distribution(status_counts)
+    plot_average_scores(df)
 
     st.subheader("Proposals with Alerts")
-    alerts = [p for p in proposals if p["scores"]["Reasons"]]
-    if alerts:
-        for p in alerts:
-            st.markdown(f"**Proposal #{p['id']}** by {p['user']} - Status: {p['status']}")
-            st.error("Alerts: " + ", ".join(p["scores"]["Reasons"]))
+    alerts = df.loc[df["Reasons"].map(bool), ["id", "user", "Status", "Reasons"]]
+    if not alerts.empty:
+        alerts = alerts.assign(Reasons=alerts["Reasons"].str.join(", "))
+        st.dataframe(alerts.rename(columns={"Reasons": "Alerts"}).set_index("id"))
     else:
         st.write("No alerts.")
 
     st.subheader("All Proposals Detail")
-    for p in proposals:
-        st.markdown(f"**Proposal #{p['id']}** by {p['user']} - Status: {p['status']}")
-        for k, v in p["scores"].items():
-            if k not in ["Reasons", "Status"]:
-                st.write(f"{k}: {v}")
-        if p["eval_comment"]:
-            st.info(f"Evaluator Comment: {p['eval_comment']}")
+    st.dataframe(df.drop(columns=["Reasons"]).set_index("id").round(2))
 
 def evaluator_dashboard():
     st.header(f"Welcome, {st.session_state.username} (Evaluator)")